@@ -0,0 +1,13 @@
+;;; map, filter and reduce over a large list.
+
+(define (range-from n acc)
+  (if (= n 0)
+      acc
+      (range-from (- n 1) (cons n acc))))
+
+(define numbers (range-from 2000 nil))
+
+(define (run-benchmark)
+  (reduce +
+          (filter even?
+                  (map (lambda (x) (* x x)) numbers))))
@@ -0,0 +1,9 @@
+;;; Calls to built-in procedures with three or more arguments.
+
+(define (add-loop n a b c d total)
+  (if (= n 0)
+      total
+      (add-loop (- n 1) a b c d (+ total (+ a b c d) (* a b c) (max a b c d)))))
+
+(define (run-benchmark)
+  (add-loop 1000 1 2 3 4 0))
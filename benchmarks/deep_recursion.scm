@@ -0,0 +1,14 @@
+;;; Non-tail recursion: every call waits on the result of a nested call.
+
+(define (count-down n)
+  (if (= n 0)
+      0
+      (+ 1 (count-down (- n 1)))))
+
+(define (fib n)
+  (if (< n 2)
+      n
+      (+ (fib (- n 1)) (fib (- n 2)))))
+
+(define (run-benchmark)
+  (+ (count-down 150) (fib 12)))
@@ -0,0 +1,12 @@
+;;; The list-change and let-to-lambda solutions from questions.scm.
+
+(load 'questions)
+
+(define nested-lets
+  '(let ((a 1) (b 2))
+     (define (f x) (let ((y (+ x a))) (* y b)))
+     (lambda (z) (let ((w z)) (f w)))))
+
+(define (run-benchmark)
+  (list (length (list-change 20 '(10 5 2 1)))
+        (let-to-lambda nested-lets)))
@@ -0,0 +1,333 @@
+"""Benchmark runner for the Scheme interpreter.
+
+Each benchmark runs in a subprocess of its own and reports its throughput in
+operations per second, the peak resident set size of that process, the peak
+traced Python allocation, the traced memory still held by the value one
+operation returns, and the number of frames and Thunks the interpreter
+created in one operation. A benchmark that fails is reported and skipped.
+
+    python benchmarks/run.py                          # run everything
+    python benchmarks/run.py tail_loop reader         # run some benchmarks
+    python benchmarks/run.py -output new.json         # save the results
+    python benchmarks/run.py -baseline old.json -threshold 0.1
+
+With -baseline, a benchmark whose throughput fell by more than THRESHOLD (a
+fraction of the baseline throughput) is reported as a regression and the
+runner exits with status 1.
+
+Scheme workloads are the .scm files in this directory. Each defines a
+procedure run-benchmark of no arguments; loading the file is setup and only
+calls to (run-benchmark) are timed. The remaining benchmarks exercise the
+interpreter from Python and are defined below.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from scheme import (create_global_frame, create_prelude, run_parallel,
+                    scheme_eval, scheme_load, disable_stats, enable_stats)
+from scheme_reader import buffer_lines, read_line, scheme_read
+
+##############
+# Benchmarks #
+##############
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Register a factory for the benchmark NAME. The factory performs any
+    setup and returns a function of no arguments that runs one operation."""
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+def scheme_benchmark(filename):
+    """Return a benchmark factory for the Scheme workload in FILENAME."""
+    def factory():
+        env = create_global_frame()
+        scheme_load(os.path.join(BENCH_DIR, filename), True, env)
+        expr = read_line('(run-benchmark)')
+        return lambda: scheme_eval(expr, env)
+    return factory
+
+for filename in sorted(os.listdir(BENCH_DIR)):
+    if filename.endswith('.scm'):
+        benchmark(filename[:-4])(scheme_benchmark(filename))
+
+def read_all(lines):
+    """Read every expression in LINES, returning how many there were."""
+    src = buffer_lines(list(lines), None)
+    count = 0
+    try:
+        while True:
+            scheme_read(src)
+            count += 1
+    except EOFError:
+        return count
+
+# Directory for the files benchmarks generate, removed when the run ends
+scratch = None
+
+def scratch_path(filename):
+    """Return the path of FILENAME in a temporary directory."""
+    global scratch
+    if scratch is None:
+        scratch = tempfile.TemporaryDirectory()
+    return os.path.join(scratch.name, filename)
+
+def generated_program(n):
+    """Return the lines of a synthetic program with N definitions, each
+    followed by a call to the procedure it defines."""
+    lines = []
+    for i in range(n):
+        lines.append('(define (f{0} x) (if (< x {0}) (+ x {0}) (* x 2)))\n'.format(i))
+        lines.append('(f{0} {0})\n'.format(i))
+    return lines
+
+@benchmark('reader')
+def reader_benchmark():
+    with open(os.path.join(ROOT, 'questions.scm')) as infile:
+        lines = infile.readlines() * 20
+    return lambda: read_all(lines)
+
+@benchmark('reader_retained')
+def reader_retained_benchmark():
+    # Returns every parsed expression after the token Buffer is released, so
+    # retained_bytes measures the size of a parsed program, including its
+    # repeated identifiers
+    lines = generated_program(500)
+    def operation():
+        src, expressions = buffer_lines(list(lines), None), []
+        try:
+            while True:
+                expressions.append(scheme_read(src))
+        except EOFError:
+            return expressions
+    return operation
+
+@benchmark('load_big_file')
+def load_benchmark():
+    path = scratch_path('big.scm')
+    with open(path, 'w') as outfile:
+        outfile.writelines(generated_program(500))
+    return lambda: scheme_load(path, True, create_global_frame())
+
+# Line-processing throughput: the same records processed through an input
+# port (read-line or read) and through the load-based workaround, in which
+# each record is written as a call to a procedure that processes it.
+
+RECORDS = 2000
+
+def records_file(template):
+    """Write RECORDS lines formatted from TEMPLATE to a temporary file and
+    return its path."""
+    path = scratch_path('records.scm')
+    with open(path, 'w') as outfile:
+        for i in range(RECORDS):
+            outfile.write(template.format(i) + '\n')
+    return path
+
+def port_benchmark(template, definition):
+    path = records_file(template)
+    env = create_global_frame()
+    scheme_eval(read_line(definition), env)
+    expr = read_line('(let ((port (open-input-file "{0}"))) '
+                     '(process port 0) (close-port port))'.format(path))
+    return lambda: scheme_eval(expr, env)
+
+@benchmark('lines_read_line')
+def read_line_benchmark():
+    return port_benchmark('{0} 1 2 3', '(define (process port n) '
+                          '(if (eof-object? (read-line port)) n '
+                          '(process port (+ n 1))))')
+
+@benchmark('lines_read')
+def read_benchmark():
+    return port_benchmark('({0} 1 2 3)', '(define (process port total) '
+                          '(let ((record (read port))) '
+                          '(if (eof-object? record) total '
+                          '(process port (+ total (car record))))))')
+
+@benchmark('lines_load')
+def lines_load_benchmark():
+    path = records_file('(process {0} 1 2 3)')
+    env = create_global_frame()
+    scheme_eval(read_line('(define (process a b c d) (+ a b c d))'), env)
+    return lambda: scheme_load(path, True, env)
+
+# Thread scaling: the same batch of programs, each in its own interpreter,
+# evaluated by pools of different sizes.
+
+PARALLEL_PROGRAM = ('(define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))'
+                    '(fib 14)')
+
+def parallel_benchmark(workers):
+    def factory():
+        prelude = create_prelude()
+        return lambda: run_parallel([PARALLEL_PROGRAM] * 4, prelude, workers)
+    return factory
+
+for workers in (1, 2, 4):
+    benchmark('parallel_{0}'.format(workers))(parallel_benchmark(workers))
+
+###############
+# Measurement #
+###############
+
+def peak_rss_kb():
+    """Return the peak resident set size of this process in kilobytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+def measure(name, min_time, repeat):
+    """Run the benchmark NAME and return a dictionary of its results."""
+    operation = BENCHMARKS[name]()
+    operation()  # Warm up caches before timing
+
+    best = None
+    for _ in range(repeat):
+        count, start = 0, time.perf_counter()
+        while True:
+            operation()
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        rate = count / elapsed
+        best = rate if best is None else max(best, rate)
+
+    tracemalloc.start()
+    stats = enable_stats()
+    stats.reset()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        value = operation()
+        retained, peak_alloc = tracemalloc.get_traced_memory()
+        del value
+    finally:
+        disable_stats()
+        tracemalloc.stop()
+
+    return {'ops_per_sec': best,
+            'peak_rss_kb': peak_rss_kb(),
+            'peak_alloc_bytes': peak_alloc,
+            'retained_bytes': retained - before,
+            'frames': stats.frames,
+            'bindings_copied': stats.bindings_copied,
+            'thunks': stats.thunks}
+
+def measure_in_subprocess(name, min_time, repeat):
+    """Run the benchmark NAME in a new Python process, so that its peak RSS is
+    its own, and return its results. If it fails, the result records the
+    error instead."""
+    command = [sys.executable, os.path.abspath(__file__), '-worker',
+               '-min-time', str(min_time), '-repeat', str(repeat), name]
+    process = subprocess.run(command, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines() or ['exit status {0}'.format(
+            process.returncode)]
+        return {'error': lines[-1]}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def compare(results, baseline, threshold):
+    """Print how RESULTS compare with BASELINE and return the names of the
+    benchmarks whose throughput regressed by more than THRESHOLD."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        if 'error' in result or 'error' in baseline.get(name, {'error': None}):
+            continue
+        old, new = baseline[name]['ops_per_sec'], result['ops_per_sec']
+        change = (new - old) / old
+        status = 'ok'
+        if change < -threshold:
+            status = 'REGRESSION'
+            regressions.append(name)
+        print('{0:<20} {1:>12.1f} -> {2:>12.1f} ops/s  {3:+7.1%}  {4}'.format(
+            name, old, new, change, status))
+    return regressions
+
+def run(argv):
+    parser = argparse.ArgumentParser(description='Scheme interpreter benchmarks')
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='benchmarks to run (default: all of them)')
+    parser.add_argument('-list', action='store_true',
+                        help='list the benchmarks and exit')
+    parser.add_argument('-min-time', type=float, default=0.5,
+                        help='minimum seconds to run each repetition')
+    parser.add_argument('-repeat', type=int, default=3,
+                        help='repetitions of each benchmark; the best is kept')
+    parser.add_argument('-output', metavar='FILE',
+                        help='write the results to FILE as JSON')
+    parser.add_argument('-baseline', metavar='FILE',
+                        help='compare with results previously saved to FILE')
+    parser.add_argument('-threshold', type=float, default=0.10,
+                        help='fractional slowdown counted as a regression')
+    parser.add_argument('-worker', action='store_true',
+                        help=argparse.SUPPRESS)  # Used by measure_in_subprocess
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(sorted(BENCHMARKS)))
+        return 0
+    names = args.names or sorted(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: {0}'.format(name))
+
+    if args.worker:
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+        os.chdir(ROOT)  # Workloads load files relative to the repository
+        try:
+            result = measure(names[0], args.min_time, args.repeat)
+        finally:
+            if scratch is not None:
+                scratch.cleanup()
+        print(json.dumps(result))
+        return 0
+
+    results, failures = {}, []
+    for name in names:
+        result = results[name] = measure_in_subprocess(
+            name, args.min_time, args.repeat)
+        if 'error' in result:
+            failures.append(name)
+            print('{0:<20} FAILED: {1}'.format(name, result['error']))
+            continue
+        print('{0:<20} {1:>12.1f} ops/s  {2:>8} KB rss  {3:>10} B alloc  '
+              '{4:>10} B retained  {5:>8} frames  {6:>8} thunks'.format(
+                  name, result['ops_per_sec'], result['peak_rss_kb'],
+                  result['peak_alloc_bytes'], result['retained_bytes'],
+                  result['frames'], result['thunks']))
+
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'benchmarks': results}, outfile, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)['benchmarks']
+        print()
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
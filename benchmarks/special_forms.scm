@@ -0,0 +1,17 @@
+;;; Evaluation dominated by special-form dispatch and symbol lookups.
+
+(define (classify n)
+  (cond ((= n 0) 'zero)
+        ((and (> n 0) (even? n)) 'positive-even)
+        ((or (< n 0) (odd? n)) (if (> n 0) 'positive-odd 'negative))
+        (else 'unknown)))
+
+(define (walk n evens)
+  (if (= n 0)
+      evens
+      (let ((kind (classify n)))
+        (begin
+          (walk (- n 1) (if (eq? kind 'positive-even) (+ evens 1) evens))))))
+
+(define (run-benchmark)
+  (walk 1000 0))
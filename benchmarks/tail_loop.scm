@@ -0,0 +1,14 @@
+;;; Tail calls: each iteration replaces the previous one on the trampoline.
+
+(define (sum n total)
+  (if (= n 0)
+      total
+      (sum (- n 1) (+ n total))))
+
+(define (count-evens n evens)
+  (cond ((= n 0) evens)
+        ((even? n) (count-evens (- n 1) (+ evens 1)))
+        (else (count-evens (- n 1) evens))))
+
+(define (run-benchmark)
+  (+ (sum 2000 0) (count-evens 2000 0)))
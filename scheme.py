@@ -2,7 +2,17 @@
 
 from scheme_builtins import *
 from scheme_reader import *
+from scheme_ports import PORT_BUILTINS, OutputPort, string_value
+import io
+from concurrent.futures import ThreadPoolExecutor
+from scheme_optimize import Optimizer, read_program
+from scheme_stats import InterpStats, StatsDumper
+from scheme_trace import CallStack, StackSampler
+import sys
+from sys import intern
 from ucb import main, trace
+from time import perf_counter
+import inspect
 
 ##############
 # Eval/Apply #
@@ -20,9 +30,10 @@ def quasi_eval(expr, env, tail=False):
         return expr
     else:
         if expr.first == 'unquote':
-            expr, expr.first = expr.second, scheme_eval(expr.second.first, env,tail)
-            if expr.second is nil:
-                return expr.first
+            value = scheme_eval(expr.second.first, env,tail)
+            if expr.second.second is nil:
+                return value
+            expr = Pair(value, expr.second.second)
         if isinstance(expr.first, Pair):
             return Pair(quasi_eval(expr.first,env), quasi_eval(expr.second,env))
         return Pair(expr.first, quasi_eval(expr.second,env))
@@ -36,55 +47,38 @@ def scheme_eval(expr, env, tail=True): # Optional third argument is ignored
     >>> scheme_eval(expr, create_global_frame())
     4
     """
+    stats = interp_stats
+    if stats is not None:
+        stats.count_eval(eval_kind(expr))
     if not isinstance(expr, Pair):
         if isinstance(expr, str) and env.bindings.get(expr, None) == None:
+            if scheme_stringp(expr):
+                return expr  # String literals evaluate to themselves
             raise SchemeError("Unknown identifier: {0}".format(expr))
         return env.bindings.get(expr, expr)
-    elif expr.first == "define":
-        if expr.second is not nil and expr.second.second is not nil:
-            if not isinstance(expr.second.first,Pair):
-                symbol = expr.second.first
-                val = expr.second.second.map(lambda param: scheme_eval(param, env)).first
-                return env.define(symbol, val)
-            else:
-                symbol = expr.second.first.first
-                formals = expr.second.first.second
-                body = expr.second.second
-                return env.define(symbol, LambdaProcedure(formals, body, env))
-        else:
-            raise SchemeError("define must contain at least 2 items.")
-    elif expr.first == 'quote':
-        return expr.second.first
-    elif expr.first == 'quasiquote':
-        return quasi_eval(expr.second.first, env)
-    elif expr.first == 'begin':
-        return begin_eval(expr.second, env)
-    elif expr.first == 'lambda':
-        return env.lambda_expr(expr.second)
-    elif expr.first == 'and':
-        return and_form(expr.second, env)
-    elif expr.first == 'or':
-        return or_form(expr.second, env)
-    elif expr.first == 'if':
-        return if_form(expr.second, env)
-    elif expr.first == 'cond':
-        return cond_form(expr.second, env)
-    elif expr.first == 'let':
-        return let_form(expr.second, env)
-    elif expr.first == 'mu':
-        return env.mu_expr(expr.second)
-    elif expr.first == 'define-macro':
-        return env.macro_expr(expr.second)
+    elif isinstance(expr.first, str) and expr.first in SPECIAL_FORMS:
+        return SPECIAL_FORMS[expr.first](expr.second, env)
     else:
-        eval_expr = expr.second.map(lambda param: scheme_eval(param, env))
         if not isinstance(expr.first, Pair):
-            if env.bindings.get(expr.first, None) != None:
-                return env.bindings[expr.first].apply(eval_expr, env)
+            procedure = env.bindings.get(expr.first, None)
+            if isinstance(procedure, BuiltinProcedure):
+                return procedure.call(eval_operands(expr.second, env), env)
+            elif procedure is not None:
+                check_procedure(procedure)
+                eval_expr = expr.second.map(lambda param: scheme_eval(param, env))
+                call_stack.push(procedure, expr)
+                return procedure.apply(eval_expr, env)
             else:
                 raise  SchemeError("Cannot call {0} as it's not a procedure".format(expr.first))
         else:
             if isinstance(expr.first.first, Pair) or expr.first.first == 'lambda' or expr.first.first == 'mu' or isinstance(env.bindings.get(expr.first.first,None), Procedure):
-                return complete_apply(scheme_eval(expr.first,env), eval_expr,env) #add functionality here
+                procedure = scheme_eval(expr.first,env)
+                if isinstance(procedure, BuiltinProcedure):
+                    return procedure.call(eval_operands(expr.second, env), env)
+                eval_expr = expr.second.map(lambda param: scheme_eval(param, env))
+                check_procedure(procedure)
+                call_stack.push(procedure, expr)
+                return procedure.apply(eval_expr, env)
             else:
                 raise  SchemeError("Cannot call {0} as it's not a procedure".format(expr.first))
 
@@ -111,6 +105,9 @@ class Frame:
             self.bindings = {}
         else:
             self.bindings = parent.bindings.copy()
+            stats = interp_stats
+            if stats is not None:
+                stats.count_frame(len(self.bindings))
 
     def __repr__(self):
         if self.parent is None:
@@ -152,6 +149,29 @@ class Frame:
         return self.define(name, MacroProcedure(formals,body))
     # END PROBLEM 2/3
 
+class FrozenFrame(Frame):
+    """A global frame with a copy of the bindings of FRAME that can no longer
+    change. Interpreters running in different threads share one FrozenFrame
+    as the parent of their own global frames.
+
+    >>> prelude = FrozenFrame(create_global_frame())
+    >>> env = Frame(prelude)
+    >>> env.define('x', 1)
+    'x'
+    >>> 'x' in prelude.bindings
+    False
+    """
+
+    def __init__(self, frame):
+        self.parent = None
+        self.bindings = dict(frame.bindings)
+
+    def __repr__(self):
+        return '<Frozen Frame>'
+
+    def define(self, symbol, value):
+        raise SchemeError('cannot define {0} in a frozen frame'.format(symbol))
+
 ##############
 # Procedures #
 ##############
@@ -159,18 +179,38 @@ class Frame:
 class Procedure:
     """The supertype of all Scheme procedures."""
     def make_call_frame(self, args, parent):
-        self.env = Frame(parent)
+        """Return a new frame for one call of SELF, extending PARENT with
+        the formal parameters of SELF bound to ARGS."""
+        frame = Frame(parent)
+        formals = self.formals
+        while args is not nil:
+            frame.define(formals.first, args.first)
+            args, formals = args.second, formals.second
+        return frame
 
 def scheme_procedurep(x):
     return isinstance(x, Procedure)
 
 class BuiltinProcedure(Procedure):
-    """A Scheme procedure defined as a Python function."""
+    """A Scheme procedure defined as a Python function.
 
-    def __init__(self, fn, use_env=False, name='builtin'):
+    A built-in accepts between MIN_ARGS and MAX_ARGS arguments. When these are
+    not given they are read from the signature of FN once, here, rather than
+    on every call. If USE_ENV is true, FN is also passed the calling
+    environment as its last argument.
+    """
+
+    def __init__(self, fn, use_env=False, name='builtin',
+                 min_args=None, max_args=None):
         self.name = name
         self.fn = fn
         self.use_env = use_env
+        if min_args is None:
+            min_args, max_args = builtin_arity(fn, use_env)
+        elif max_args is None:
+            max_args = min_args
+        self.min_args = min_args
+        self.max_args = max_args
 
     def __str__(self):
         return '#[{0}]'.format(self.name)
@@ -184,38 +224,96 @@ class BuiltinProcedure(Procedure):
         >>> plus.apply(twos, env)
         4
         """
-        # BEGIN PROBLEM 2
-        "*** YOUR CODE HERE ***"
-        args_list = []
-        try:
-            if args is nil:
-                return self.fn()
-            elif args.second is nil:
-                if self.use_env:
-                    return self.fn(args.first, env)
-                return self.fn(args.first)
-            elif args.second.second is nil:
-                if self.use_env:
-                    return self.fn(args.first, args.second.first, env)
-                return self.fn(args.first, args.second.first)
-            else:
-                while args is not nil:
-                    if isinstance(args.first, Pair):
-                        args_list.extend(scheme_eval(args.first, env))
-                    else:
-                        args_list.append(args.first)
-                    args = args.second
-                return self.fn(*args_list)
-        except:
-            raise SchemeError("Cannot call {0} as it's not a procedure".format(args))
+        argv = []
+        while args is not nil:
+            argv.append(args.first)
+            args = args.second
+        return self.call(argv, env)
 
-        # END PROBLEM 2
+    def call(self, argv, env):
+        """Call SELF in ENV on ARGV, a Python list of argument values that
+        SELF may consume.
 
+        >>> env = create_global_frame()
+        >>> env.bindings['+'].call([1, 2, 3, 4], env)
+        10
+        """
+        if not self.min_args <= len(argv) <= self.max_args:
+            raise SchemeError('{0} expects {1}, got {2}'.format(
+                self.name, arity_str(self.min_args, self.max_args), len(argv)))
+        if self.use_env:
+            argv.append(env)
+        stats = interp_stats  # May be disabled by the call itself
+        if stats is None:
+            return self.call_fn(argv)
+        start = perf_counter()
+        try:
+            return self.call_fn(argv)
+        finally:
+            stats.count_builtin(self.name, perf_counter() - start)
 
+    def call_fn(self, argv):
+        """Call the Python function of SELF, reporting Python errors raised by
+        it, such as a float overflow, as SchemeErrors that name SELF."""
+        try:
+            return self.fn(*argv)
+        except (TypeError, ArithmeticError, ValueError) as err:
+            raise SchemeError('{0}: {1}'.format(self.name, err)) from err
+
+def builtin_arity(fn, use_env):
+    """Return the minimum and maximum number of Scheme arguments that the
+    Python function FN accepts, excluding the environment if USE_ENV.
+
+    >>> builtin_arity(lambda a, b=1: a, False)
+    (1, 2)
+    >>> builtin_arity(lambda *vals: 0, False)
+    (0, inf)
+    >>> builtin_arity(lambda f, s, env: s, True)
+    (2, 2)
+    """
+    try:
+        params = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return 0, float('inf')
+    min_args = max_args = 0
+    for param in params:
+        if param.kind == param.VAR_POSITIONAL:
+            max_args = float('inf')
+        elif param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+            max_args += 1
+            if param.default is param.empty:
+                min_args += 1
+    if use_env:
+        min_args, max_args = max(min_args - 1, 0), max_args - 1
+    return min_args, max_args
+
+def arity_str(min_args, max_args):
+    """Describe an argument count between MIN_ARGS and MAX_ARGS.
+
+    >>> arity_str(1, 1), arity_str(0, 2), arity_str(1, float('inf'))
+    ('1 argument', '0 to 2 arguments', 'at least 1 argument')
+    """
+    plural = lambda n: '{0} argument{1}'.format(n, '' if n == 1 else 's')
+    if min_args == max_args:
+        return plural(min_args)
+    elif max_args == float('inf'):
+        return 'at least ' + plural(min_args)
+    return '{0} to {1}'.format(min_args, plural(max_args))
+
+def eval_operands(operands, env):
+    """Evaluate each expression in the Scheme list OPERANDS in ENV, returning
+    a Python list of their values."""
+    argv = []
+    while operands is not nil:
+        argv.append(scheme_eval(operands.first, env))
+        operands = operands.second
+    return argv
 
 class LambdaProcedure(Procedure):
     """A procedure defined by a lambda expression or a define form."""
 
+    name = None  # Set to the defined symbol by define
+
     def __init__(self, formals, body, env):
         """A procedure with formal parameter list FORMALS (a Scheme list),
         whose body is the Scheme list BODY, and whose parent environment
@@ -239,15 +337,11 @@ class LambdaProcedure(Procedure):
         elif len(args) < len(self.formals):
             raise SchemeError('Too few arguments to function call.')
         else:
-            self.make_call_frame(args, self.env)
-            temp_formals = self.formals
-            while args is not nil:
-                self.env.define(temp_formals.first, args.first)
-                args, temp_formals = args.second, temp_formals.second
+            frame = self.make_call_frame(args, self.env)
             if len(self.body) <= 1:
-                return scheme_eval(self.body.first, self.env,True)
+                return scheme_eval(self.body.first, frame,True)
             else:
-                return begin_eval(self.body,self.env)
+                return begin_eval(self.body,frame)
 
 def add_builtins(frame, funcs_and_names):
     """Enter bindings in FUNCS_AND_NAMES into FRAME, an environment frame,
@@ -264,6 +358,30 @@ def add_builtins(frame, funcs_and_names):
 How you implement special forms is up to you. We recommend you encapsulate the
 logic for each special form separately somehow, which you can do here.
 """
+def define_form(args, env):
+    if args is not nil and args.second is not nil:
+        if not isinstance(args.first,Pair):
+            symbol = args.first
+            val = args.second.map(lambda param: scheme_eval(param, env)).first
+            if isinstance(val, (LambdaProcedure, MuProcedure)) and val.name is None:
+                val.name = symbol
+            return env.define(symbol, val)
+        else:
+            symbol = args.first.first
+            formals = args.first.second
+            body = args.second
+            procedure = LambdaProcedure(formals, body, env)
+            procedure.name = symbol
+            return env.define(symbol, procedure)
+    else:
+        raise SchemeError("define must contain at least 2 items.")
+
+def quote_form(args, env):
+    return args.first
+
+def quasiquote_form(args, env):
+    return quasi_eval(args.first, env)
+
 def and_form(args,env):
     if args is nil:
         return True
@@ -327,6 +445,23 @@ def let_form(args, env):
     new_proc = LambdaProcedure(names, body, env)
     return scheme_eval(new_proc, env).apply(expr, env)
 
+# Each special form's name, interned so that it is the same object as the
+# symbols produced by scheme_read, mapped to the function that evaluates it
+SPECIAL_FORMS = {intern(name): form for name, form in [
+    ('define', define_form),
+    ('quote', quote_form),
+    ('quasiquote', quasiquote_form),
+    ('begin', begin_eval),
+    ('lambda', lambda args, env: env.lambda_expr(args)),
+    ('and', and_form),
+    ('or', or_form),
+    ('if', if_form),
+    ('cond', cond_form),
+    ('let', let_form),
+    ('mu', lambda args, env: env.mu_expr(args)),
+    ('define-macro', lambda args, env: env.macro_expr(args)),
+]}
+
 
 # Utility methods for checking the structure of Scheme programs
 
@@ -389,6 +524,8 @@ class MuProcedure(Procedure):
                     ||     ||
     """
 
+    name = None  # Set to the defined symbol by define
+
     def __init__(self, formals, body):
         """A procedure with formal parameter list FORMALS (a Scheme list) and
         Scheme list BODY as its definition."""
@@ -411,14 +548,11 @@ class MuProcedure(Procedure):
         elif len(args) < len(self.formals):
             raise SchemeError('Too few arguments to function call.')
         else:
-            temp_formals = self.formals
-            while args is not nil:
-                env.define(temp_formals.first, args.first)
-                args, temp_formals = args.second, temp_formals.second
+            frame = self.make_call_frame(args, env)
             if len(self.body) <= 1:
-                return scheme_eval(self.body.first, env,True)
+                return scheme_eval(self.body.first, frame,True)
             else:
-                return scheme_eval(begin_eval(self.body,env),env)
+                return scheme_eval(begin_eval(self.body,frame),frame)
 
 class MacroProcedure(Procedure):
     def __init__(self, formals, body):
@@ -450,30 +584,50 @@ class Thunk:
     def __init__(self, expr, env):
         self.expr = expr
         self.env = env
+        stats = interp_stats
+        if stats is not None:
+            stats.thunks += 1
 
 
 def make_tail_eval(eval_func):
     def tail_eval(expr, env, tail=False):
         if tail and not scheme_symbolp(expr) and not scheme_atomp(expr) and expr is not None:
             return Thunk(expr, env)
-        eval_expr = Thunk(expr, env)
-        while isinstance(eval_expr,Thunk):
-            eval_expr = eval_func(eval_expr.expr,eval_expr.env)
-        return eval_expr
+        if not isinstance(expr, Pair):
+            return eval_func(expr, env)  # Atoms make no calls to record
+        base = call_stack.enter()
+        try:
+            eval_expr = Thunk(expr, env)
+            while isinstance(eval_expr,Thunk):
+                stats = interp_stats
+                if stats is not None:
+                    stats.trampoline_iterations += 1
+                eval_expr = eval_func(eval_expr.expr,eval_expr.env)
+            return eval_expr
+        except SchemeError as err:
+            call_stack.annotate(err)
+            raise
+        finally:
+            call_stack.exit(base)
     return tail_eval
 
 scheme_eval = make_tail_eval(scheme_eval)
 
 
-def complete_apply(procedure, args, env):
+def complete_apply(procedure, args, env, call_site=None):
     """Apply procedure to args in env; ensure the result is not a Thunk.
-    Right now it just calls scheme_apply, but you will need to change this
-    if you attempt the extra credit."""
-    val = scheme_apply(procedure, args, env)
-    # Add stuff here?
-    if isinstance(val, Thunk):
-        return scheme_eval(val.expr, val.env)
-    return val
+    CALL_SITE is the expression that made the call, if there was one."""
+    check_type(args, scheme_listp, 1, 'apply')
+    base = call_stack.enter()
+    try:
+        if not isinstance(procedure, BuiltinProcedure):
+            call_stack.push(procedure, call_site)
+        val = scheme_apply(procedure, args, env)
+        if isinstance(val, Thunk):
+            return scheme_eval(val.expr, val.env)
+        return val
+    finally:
+        call_stack.exit(base)
 ####################
 # Extra Procedures #
 ####################
@@ -508,21 +662,204 @@ def scheme_reduce(fn, s, env):
         s = s.second
     return value
 
+###################
+# Instrumentation #
+###################
+
+# The Scheme procedure calls being evaluated, shown in SchemeError messages.
+call_stack = CallStack()
+
+def start_sampling(interval=0.01):
+    """Record the Scheme call stack every INTERVAL seconds in a background
+    thread. Returns the StackSampler; its stop method ends sampling and its
+    report method summarizes the samples."""
+    sampler = StackSampler(call_stack, interval)
+    sampler.start()
+    return sampler
+
+# The InterpStats being updated by the interpreter, or None when disabled.
+# Every hot path tests this global before counting, so a disabled
+# interpreter pays a single comparison per event.  Interpreters running in
+# several threads update the same counters, which are then approximate.
+interp_stats = None
+
+def eval_kind(expr):
+    """Classify EXPR for InterpStats.count_eval.
+
+    >>> eval_kind(read_line('(if #t 1 2)'))
+    'if'
+    >>> eval_kind(read_line('(f 1)')), eval_kind('x'), eval_kind(3)
+    ('call', 'symbol', 'self-evaluating')
+    """
+    if isinstance(expr, Pair):
+        if isinstance(expr.first, str) and expr.first in SPECIAL_FORMS:
+            return expr.first
+        return 'call'
+    if isinstance(expr, str) and not scheme_stringp(expr):
+        return 'symbol'
+    return 'self-evaluating'
+
+def enable_stats():
+    """Start collecting interpreter statistics and return the InterpStats
+    being updated. Counters already being collected are kept."""
+    global interp_stats
+    if interp_stats is None:
+        interp_stats = InterpStats()
+    return interp_stats
+
+def disable_stats():
+    """Stop collecting interpreter statistics and return the final
+    InterpStats, or None if they were not being collected."""
+    global interp_stats
+    stats, interp_stats = interp_stats, None
+    return stats
+
+def get_stats():
+    """Return the InterpStats being updated, or None if disabled."""
+    return interp_stats
+
+def start_stats_dump(path, interval=1.0):
+    """Enable statistics and append a JSON line snapshot of them to the file
+    at PATH every INTERVAL seconds. Returns the StatsDumper thread, whose
+    stop method writes a final snapshot."""
+    enable_stats()
+    dumper = StatsDumper(get_stats, path, interval)
+    dumper.start()
+    return dumper
+
+def dict_to_alist(d):
+    """Convert a dictionary D into a Scheme association list of dotted pairs,
+    converting nested dictionaries recursively."""
+    alist = nil
+    for key in sorted(d, reverse=True):
+        value = d[key]
+        if isinstance(value, dict):
+            value = dict_to_alist(value)
+        alist = Pair(Pair(key, value), alist)
+    return alist
+
+def scheme_interp_stats(command=None):
+    """Return the interpreter statistics as an association list, or nil if
+    they are not being collected. COMMAND may be the symbol on, off or reset
+    to enable, disable or clear the statistics before they are returned."""
+    if command == 'on':
+        enable_stats()
+    elif command == 'off':
+        disable_stats()
+    elif command == 'reset':
+        stats = interp_stats
+        if stats is not None:
+            stats.reset()
+    elif command is not None:
+        raise SchemeError('interp-stats expects on, off or reset, not {0}'.format(
+            repl_str(command)))
+    stats = interp_stats
+    if stats is None:
+        return nil
+    return dict_to_alist(stats.snapshot())
+
+def scheme_call_with_output_string(fn, env):
+    """Apply FN to a new string port and return what it wrote to the port
+    as a Scheme string."""
+    check_type(fn, scheme_procedurep, 0, 'call-with-output-string')
+    port = OutputPort(io.StringIO(), 'string')
+    complete_apply(fn, Pair(port, nil), env)
+    return port.getvalue()
+
+#######################
+# Parallel Evaluation #
+#######################
+
+# Interpreters in different threads share nothing mutable: call frames are
+# created per call, the call stack is thread-local, and each interpreter's
+# global frame copies the bindings of a FrozenFrame prelude. Under the GIL the
+# threads interleave; on a free-threaded build of Python they run in parallel.
+
+def create_prelude(load_files=()):
+    """Return a FrozenFrame holding the built-in procedures and everything
+    defined by loading the Scheme files in LOAD_FILES."""
+    env = create_global_frame()
+    for filename in load_files:
+        scheme_load(filename, True, env)
+    return FrozenFrame(env)
+
+shared_prelude = None
+
+def get_shared_prelude():
+    """Return the prelude of built-in procedures shared by run_parallel."""
+    global shared_prelude
+    if shared_prelude is None:
+        shared_prelude = create_prelude()
+    return shared_prelude
+
+def eval_source(source, env):
+    """Evaluate every expression in the Scheme source string SOURCE in ENV,
+    returning the value of the last one."""
+    src = buffer_lines(source.splitlines(), None)
+    value = None
+    while True:
+        try:
+            expression = scheme_read(src)
+        except EOFError:
+            return value
+        value = scheme_eval(expression, env)
+
+def run_parallel(programs, prelude=None, workers=None):
+    """Evaluate each of PROGRAMS in an interpreter of its own using a pool of
+    WORKERS threads, and return a list of the values of the programs. Each
+    program is a Scheme expression or a string of Scheme source, in which case
+    its value is that of its last expression.
+
+    Each interpreter has its own global frame extending PRELUDE, which
+    defaults to a prelude of built-in procedures.
+
+    >>> run_parallel(['(define (sq x) (* x x)) (sq 3)', read_line('(+ 1 2)')])
+    [9, 3]
+    """
+    if prelude is None:
+        prelude = get_shared_prelude()
+    def run_one(program):
+        env = Frame(prelude)
+        if isinstance(program, str):
+            return eval_source(program, env)
+        return scheme_eval(program, env)
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(run_one, programs))
+
+def scheme_run_parallel(expressions, env):
+    """Evaluate each of the Scheme list EXPRESSIONS in parallel, each in an
+    interpreter of its own whose prelude is a snapshot of ENV."""
+    check_type(expressions, scheme_listp, 0, 'run-parallel')
+    programs = []
+    while expressions is not nil:
+        programs.append(expressions.first)
+        expressions = expressions.second
+    return scheme_list(*run_parallel(programs, FrozenFrame(env)))
+
 ################
 # Input/Output #
 ################
 
 def read_eval_print_loop(next_line, env, interactive=False, quiet=False,
-                         startup=False, load_files=()):
-    """Read and evaluate input until an end of file or keyboard interrupt."""
+                         startup=False, load_files=(), optimizer=None):
+    """Read and evaluate input until an end of file or keyboard interrupt.
+
+    If OPTIMIZER is given, the expressions of LOAD_FILES and, unless
+    INTERACTIVE, those read from NEXT_LINE are optimized before evaluation.
+    The Optimizer must have been created for the program they make up.
+    """
     if startup:
         for filename in load_files:
-            scheme_load(filename, True, env)
+            scheme_load(filename, True, env, optimizer=optimizer)
+    if interactive:
+        optimizer = None
     while True:
         try:
             src = next_line()
             while src.more_on_line:
                 expression = scheme_read(src)
+                if optimizer is not None:
+                    expression = optimizer.optimize(expression)
                 result = scheme_eval(expression, env)
                 if not quiet and result is not None:
                     print(repl_str(result))
@@ -545,10 +882,11 @@ def read_eval_print_loop(next_line, env, interactive=False, quiet=False,
             print()
             return
 
-def scheme_load(*args):
+def scheme_load(*args, optimizer=None):
     """Load a Scheme source file. ARGS should be of the form (SYM, ENV) or
     (SYM, QUIET, ENV). The file named SYM is loaded into environment ENV,
-    with verbosity determined by QUIET (default true)."""
+    with verbosity determined by QUIET (default true). Its expressions are
+    optimized by OPTIMIZER, if given."""
     if not (2 <= len(args) <= 3):
         expressions = args[:-1]
         raise SchemeError('"load" given incorrect number of arguments: '
@@ -557,7 +895,7 @@ def scheme_load(*args):
     quiet = args[1] if len(args) > 2 else True
     env = args[-1]
     if (scheme_stringp(sym)):
-        sym = eval(sym)
+        sym = string_value(sym)
     check_type(sym, scheme_symbolp, 0, 'load')
     with scheme_open(sym) as infile:
         lines = infile.readlines()
@@ -565,7 +903,7 @@ def scheme_load(*args):
     def next_line():
         return buffer_lines(*args)
 
-    read_eval_print_loop(next_line, env, quiet=quiet)
+    read_eval_print_loop(next_line, env, quiet=quiet, optimizer=optimizer)
 
 def scheme_open(filename):
     """If either FILENAME or FILENAME.scm is the name of a valid file,
@@ -584,11 +922,11 @@ def create_global_frame():
     """Initialize and return a single-frame environment with built-in names."""
     env = Frame(None)
     env.define('eval',
-               BuiltinProcedure(scheme_eval, True, 'eval'))
+               BuiltinProcedure(scheme_eval, True, 'eval', 1))
     env.define('apply',
-               BuiltinProcedure(complete_apply, True, 'apply'))
+               BuiltinProcedure(complete_apply, True, 'apply', 2))
     env.define('load',
-               BuiltinProcedure(scheme_load, True, 'load'))
+               BuiltinProcedure(scheme_load, True, 'load', 1, 2))
     env.define('procedure?',
                BuiltinProcedure(scheme_procedurep, False, 'procedure?'))
     env.define('map',
@@ -597,8 +935,16 @@ def create_global_frame():
                BuiltinProcedure(scheme_filter, True, 'filter'))
     env.define('reduce',
                BuiltinProcedure(scheme_reduce, True, 'reduce'))
+    env.define('interp-stats',
+               BuiltinProcedure(scheme_interp_stats, False, 'interp-stats'))
+    env.define('call-with-output-string',
+               BuiltinProcedure(scheme_call_with_output_string, True,
+                                'call-with-output-string'))
+    env.define('run-parallel',
+               BuiltinProcedure(scheme_run_parallel, True, 'run-parallel'))
     env.define('undefined', None)
     add_builtins(env, BUILTINS)
+    add_builtins(env, PORT_BUILTINS)
     return env
 
 @main
@@ -607,6 +953,16 @@ def run(*argv):
     parser = argparse.ArgumentParser(description='CS 61A Scheme Interpreter')
     parser.add_argument('-load', '-i', action='store_true',
                        help='run file interactively')
+    parser.add_argument('-stats', metavar='FILE', default=None,
+                        help='append interpreter statistics to FILE as JSON lines')
+    parser.add_argument('-stats-interval', metavar='SECONDS', type=float,
+                        default=1.0, help='seconds between statistics snapshots')
+    parser.add_argument('-sample', metavar='MS', type=float, default=None,
+                        help='sample the Scheme call stack every MS milliseconds '
+                             'and print the hottest procedures on exit')
+    parser.add_argument('-O', dest='optimize', action='store_true',
+                        help='optimize the file before evaluating it and '
+                             'report the nodes eliminated')
     parser.add_argument('file', nargs='?',
                         type=argparse.FileType('r'), default=None,
                         help='Scheme file to run')
@@ -615,16 +971,40 @@ def run(*argv):
     next_line = buffer_input
     interactive = True
     load_files = []
+    env = create_global_frame()
+    optimizer = None
 
     if args.file is not None:
+        lines = args.file.readlines()
+        if args.optimize:
+            # Definitions typed at the prompt after -load could rebind any
+            # builtin, so an interactive session never folds builtin calls
+            program = None if args.load else read_program(lines)
+            optimizer = Optimizer(env, program)
         if args.load:
             load_files.append(getattr(args.file, 'name'))
         else:
-            lines = args.file.readlines()
             def next_line():
                 return buffer_lines(lines)
             interactive = False
 
-    read_eval_print_loop(next_line, create_global_frame(), startup=True,
-                         interactive=interactive, load_files=load_files)
+    dumper = None
+    if args.stats is not None:
+        dumper = start_stats_dump(args.stats, args.stats_interval)
+    sampler = None
+    if args.sample is not None:
+        sampler = start_sampling(args.sample / 1000)
+
+    try:
+        read_eval_print_loop(next_line, env, startup=True,
+                             interactive=interactive, load_files=load_files,
+                             optimizer=optimizer)
+    finally:
+        if optimizer is not None:
+            print(optimizer.report(getattr(args.file, 'name')), file=sys.stderr)
+        if dumper is not None:
+            dumper.stop()
+        if sampler is not None:
+            sampler.stop()
+            print(sampler.report(), file=sys.stderr)
     tscheme_exitonclick()
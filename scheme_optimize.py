@@ -0,0 +1,326 @@
+"""An optional optimizer that simplifies Scheme expressions before they are
+evaluated.
+
+The optimizer rewrites each expression of a program without changing its
+meaning:
+    - calls to pure built-in procedures on literal numbers and booleans are
+      replaced by their values, as long as the program never rebinds the
+      built-in's name;
+    - if, cond, and and or forms with literal tests lose the branches that
+      can never be evaluated;
+    - let forms become direct applications of lambda expressions;
+    - begin forms nested in begin forms are flattened.
+"""
+
+import collections
+
+from scheme_builtins import *
+from scheme_reader import *
+
+# Built-in procedures without side effects whose result depends only on
+# their arguments
+PURE_BUILTINS = frozenset([
+    '+', '-', '*', '/', '=', '<', '>', '<=', '>=', 'abs', 'quotient',
+    'remainder', 'modulo', 'expt', 'min', 'max', 'not', 'even?', 'odd?',
+    'zero?', 'number?', 'integer?', 'boolean?', 'null?'])
+
+# Names whose use means a program can create definitions the optimizer
+# cannot see
+DYNAMIC_NAMES = frozenset(['eval', 'load', 'define-macro'])
+
+def is_literal(expr):
+    """Return whether EXPR is a number or boolean, which evaluates to
+    itself."""
+    return isinstance(expr, (int, float))
+
+def count_nodes(expr):
+    """Return the number of Pairs in EXPR.
+
+    >>> count_nodes(read_line('(+ 1 (* 2 3))'))
+    6
+    """
+    count = 0
+    while isinstance(expr, Pair):
+        count += 1 + count_nodes(expr.first)
+        expr = expr.second
+    return count
+
+def to_list(s):
+    """Return the elements of the Scheme list S as a Python list."""
+    items = []
+    while isinstance(s, Pair):
+        items.append(s.first)
+        s = s.second
+    return items
+
+def to_scheme(items, rest=nil):
+    """Return a Scheme list of the elements of the Python list ITEMS,
+    followed by REST."""
+    for item in reversed(items):
+        rest = Pair(item, rest)
+    return rest
+
+def bound_symbols(expressions):
+    """Return the set of symbols that EXPRESSIONS define or bind as formal
+    parameters anywhere, including in quoted data that could later be
+    evaluated, and whether they use any of DYNAMIC_NAMES.
+
+    >>> sorted(bound_symbols([read_line('(define (f x) (let ((y x)) y))')])[0])
+    ['f', 'x', 'y']
+    """
+    names, dynamic = set(), False
+    def bind(formals):
+        while isinstance(formals, Pair):
+            if isinstance(formals.first, str):
+                names.add(formals.first)
+            formals = formals.second
+        if isinstance(formals, str):
+            names.add(formals)
+    def scan(expr):
+        nonlocal dynamic
+        if isinstance(expr, str):
+            dynamic = dynamic or expr in DYNAMIC_NAMES
+        if not isinstance(expr, Pair):
+            return
+        head, rest = expr.first, expr.second
+        if head in ('define', 'lambda', 'mu') and isinstance(rest, Pair):
+            target = rest.first
+            if head == 'define' and not isinstance(target, Pair):
+                bind(Pair(target, nil))
+            else:
+                bind(target)
+        elif head == 'let' and isinstance(rest, Pair):
+            for binding in to_list(rest.first):
+                if isinstance(binding, Pair):
+                    bind(Pair(binding.first, nil))
+        while isinstance(expr, Pair):
+            scan(expr.first)
+            expr = expr.second
+    for expr in expressions:
+        scan(expr)
+    return names, dynamic
+
+def read_program(lines):
+    """Return a list of the expressions in LINES, or None if they cannot all
+    be read."""
+    src = buffer_lines(list(lines), None)
+    expressions = []
+    try:
+        while True:
+            expressions.append(scheme_read(src))
+    except EOFError:
+        return expressions
+    except (SyntaxError, ValueError):
+        return None
+
+class Optimizer:
+    """Optimizes the expressions of a program in the global frame ENV, where
+    PROGRAM is a list of all the expressions of the program. If PROGRAM is
+    None, no built-in calls are folded, since any name may be rebound.
+
+    >>> from scheme import create_global_frame
+    >>> env = create_global_frame()
+    >>> program = [read_line('(if (and #t #f) (+ 1 2) (let ((x (+ 3 4))) x))')]
+    >>> optimizer = Optimizer(env, program)
+    >>> print(optimizer.optimize(program[0]))
+    ((lambda (x) x) 7)
+    >>> optimizer.eliminated
+    13
+    """
+
+    def __init__(self, env, program):
+        """A program that rebinds a built-in's name never has calls to it
+        folded, wherever the rebinding appears.
+
+        >>> from scheme import create_global_frame
+        >>> program = read_program(['(define (k) (+ 1 2))',
+        ...                         '(define (+ a b) 100)'])
+        >>> optimizer = Optimizer(create_global_frame(), program)
+        >>> print(optimizer.optimize(program[0]))
+        (define (k) (+ 1 2))
+        >>> optimizer = Optimizer(create_global_frame(), None)
+        >>> print(optimizer.optimize(read_line('(+ 1 2)')))
+        (+ 1 2)
+        """
+        self.env = env
+        names, dynamic = bound_symbols(program or [])
+        self.foldable = set()
+        if program is not None and not dynamic:
+            self.foldable = set(name for name in PURE_BUILTINS
+                                if name in env.bindings and name not in names)
+        self.nodes = 0
+        self.eliminated = 0
+        self.rewrites = collections.Counter()
+
+    def optimize(self, expr):
+        """Return an optimized equivalent of EXPR."""
+        before = count_nodes(expr)
+        expr = self.simplify(expr)
+        self.nodes += before
+        self.eliminated += before - count_nodes(expr)
+        return expr
+
+    def report(self, name):
+        """Describe what the optimizer has done to the program NAME."""
+        rewrites = ', '.join('{0} {1}'.format(count, kind)
+                             for kind, count in sorted(self.rewrites.items()))
+        return '{0}: {1} of {2} nodes eliminated ({3})'.format(
+            name, self.eliminated, self.nodes, rewrites or 'no rewrites')
+
+    def simplify(self, expr):
+        if not isinstance(expr, Pair) or not scheme_listp(expr):
+            return expr
+        head = expr.first
+        if head in ('quote', 'quasiquote', 'define-macro'):
+            return expr
+        elif head in ('define', 'lambda', 'mu'):
+            if not isinstance(expr.second, Pair):
+                return expr
+            body = self.simplify_all(expr.second.second)
+            return Pair(head, Pair(expr.second.first, body))
+        elif head == 'begin':
+            return self.simplify_begin(expr.second)
+        elif head == 'if':
+            return self.simplify_if(expr.second)
+        elif head == 'cond':
+            return self.simplify_cond(expr.second)
+        elif head == 'and':
+            return self.simplify_and_or(expr.second, True)
+        elif head == 'or':
+            return self.simplify_and_or(expr.second, False)
+        elif head == 'let':
+            return self.simplify_let(expr)
+        operands = self.simplify_all(expr.second)
+        foldable = isinstance(head, str) and head in self.foldable
+        if foldable and all(map(is_literal, to_list(operands))):
+            try:
+                value = self.env.bindings[head].apply(operands, self.env)
+            except Exception:
+                pass  # Leave the call in place to raise its error when run
+            else:
+                if is_literal(value):
+                    self.rewrites['calls folded'] += 1
+                    return value
+        return Pair(self.simplify(head), operands)
+
+    def simplify_all(self, exprs):
+        """Simplify each expression in the Scheme list EXPRS."""
+        return to_scheme([self.simplify(e) for e in to_list(exprs)])
+
+    def simplify_begin(self, exprs):
+        flat = []
+        for expr in to_list(self.simplify_all(exprs)):
+            if isinstance(expr, Pair) and expr.first == 'begin' and expr.second is not nil:
+                self.rewrites['begins flattened'] += 1
+                flat.extend(to_list(expr.second))
+            else:
+                flat.append(expr)
+        if len(flat) == 1:
+            self.rewrites['begins flattened'] += 1
+            return flat[0]
+        return Pair('begin', to_scheme(flat))
+
+    def simplify_if(self, args):
+        args = self.simplify_all(args)
+        items = to_list(args)
+        if len(items) in (2, 3) and is_literal(items[0]):
+            if items[0] is not False:
+                self.rewrites['branches pruned'] += 1
+                return items[1]
+            elif len(items) == 3:
+                self.rewrites['branches pruned'] += 1
+                return items[2]
+        return Pair('if', args)
+
+    def simplify_cond(self, clauses):
+        """Simplify the CLAUSES of a cond form, dropping those with a false
+        literal test and those after a clause that must be chosen.
+
+        >>> from scheme import create_global_frame
+        >>> optimizer = Optimizer(create_global_frame(), [])
+        >>> print(optimizer.optimize(read_line('(cond (#f 1) ((f) 2) (#t 3) (else 4))')))
+        (cond ((f) 2) (#t 3))
+        >>> print(optimizer.optimize(read_line('(cond (#f 1) (else (g) 4))')))
+        (begin (g) 4)
+        """
+        kept, clause_count = [], len(to_list(clauses))
+        for clause in to_list(clauses):
+            if not scheme_listp(clause) or clause is nil:
+                return Pair('cond', clauses)  # Leave errors for cond to report
+            clause = self.simplify_all(clause)
+            test = clause.first
+            if test is False:
+                continue
+            kept.append(clause)
+            if test == 'else' or is_literal(test):
+                break
+        self.rewrites['branches pruned'] += clause_count - len(kept)
+        if kept and (kept[0].first == 'else' or is_literal(kept[0].first)):
+            if kept[0].second is nil:
+                return kept[0].first
+            return self.simplify_begin(kept[0].second)
+        return Pair('cond', to_scheme(kept))
+
+    def simplify_and_or(self, args, is_and):
+        """Simplify the arguments ARGS of an and form (if IS_AND) or an or
+        form. A literal that cannot decide the result is dropped; one that
+        does decides it, dropping the arguments after it.
+
+        >>> from scheme import create_global_frame
+        >>> optimizer = Optimizer(create_global_frame(), [])
+        >>> print(optimizer.optimize(read_line('(and #t x #t y)')))
+        (and x y)
+        >>> print(optimizer.optimize(read_line('(and x #f y)')))
+        (and x #f)
+        >>> print(optimizer.optimize(read_line('(or #f x 3 y)')))
+        (or x 3)
+        >>> optimizer.optimize(read_line('(or #f #f)'))
+        False
+        """
+        items, kept = to_list(self.simplify_all(args)), []
+        for i, item in enumerate(items):
+            last = i == len(items) - 1
+            if is_literal(item) and (item is not False) == is_and:
+                if not last:
+                    self.rewrites['branches pruned'] += 1
+                    continue
+            kept.append(item)
+            if is_literal(item) and not last:
+                self.rewrites['branches pruned'] += 1
+                break
+        if not kept:
+            return is_and
+        if len(kept) == 1:
+            return kept[0]
+        return Pair('and' if is_and else 'or', to_scheme(kept))
+
+    def simplify_let(self, expr):
+        """Turn the let form EXPR into an application of a lambda expression.
+        A tail call in its body is still a tail call.
+
+        >>> from scheme import create_global_frame, scheme_eval
+        >>> env = create_global_frame()
+        >>> program = read_program([
+        ...     '(define (loop n) (let ((m n)) (if (= m 0) 0 (loop (- m 1)))))',
+        ...     '(loop 5000)'])
+        >>> optimizer = Optimizer(env, program)
+        >>> print(optimizer.optimize(program[0]))
+        (define (loop n) ((lambda (m) (if (= m 0) 0 (loop (- m 1)))) n))
+        >>> scheme_eval(optimizer.optimize(program[0]), env)
+        'loop'
+        >>> scheme_eval(optimizer.optimize(program[1]), env)
+        0
+        """
+        args = expr.second
+        if not isinstance(args, Pair) or not scheme_listp(args.first):
+            return expr
+        names, values = [], []
+        for binding in to_list(args.first):
+            if not scheme_listp(binding) or len(binding) != 2:
+                return expr  # Leave errors for let to report
+            names.append(binding.first)
+            values.append(self.simplify(binding.second.first))
+        body = self.simplify_all(args.second)
+        self.rewrites['lets inlined'] += 1
+        return Pair(Pair('lambda', Pair(to_scheme(names), body)),
+                    to_scheme(values))
@@ -0,0 +1,207 @@
+"""Ports: Scheme values for reading from and writing to files and strings.
+
+Scheme strings are represented by Python strings that include their
+surrounding double quotes, as read from the source.  An input port reads
+a file or string lazily, a line or an expression at a time; an output port
+writes to a file or to an in-memory buffer.
+"""
+
+import ast
+import io
+import json
+import sys
+
+from scheme_builtins import *
+from scheme_reader import *
+from scheme_tokens import next_candidate_token, tokenize_lines
+from buffer import Buffer
+
+# Size in bytes of the buffer used for reading and writing files
+CHUNK_SIZE = 1 << 16
+
+def string_value(s):
+    """Return the text of the Scheme string S.
+
+    >>> string_value('"abc"')
+    'abc'
+    """
+    return ast.literal_eval(s)
+
+def make_string(text):
+    """Return the Scheme string whose text is TEXT, escaping any quotes,
+    backslashes and newlines in it.
+
+    >>> make_string('abc')
+    '"abc"'
+    """
+    return json.dumps(text, ensure_ascii=False)
+
+class EofObject:
+    """The value returned by reading from an exhausted input port."""
+
+    def __repr__(self):
+        return 'eof'
+
+    def __str__(self):
+        return '#[eof]'
+
+eof = EofObject() # There is only one instance
+
+class InputPort:
+    """A port reading from FILE, a Python text file or file-like object.
+
+    read_line and read may be interleaved: both continue from where the last
+    call to either stopped. If read stops before the end of a line, read_line
+    returns the rest of that line.
+
+    >>> port = InputPort(io.StringIO('first line\\n(1 2)\\n3'), 'string')
+    >>> port.read_line()
+    '"first line"'
+    >>> port.read()
+    Pair(1, Pair(2, nil))
+    >>> port.read()
+    3
+    >>> port.read()
+    eof
+    >>> port = InputPort(io.StringIO('1 2\\nsecond\\nthird\\n'), 'string')
+    >>> port.read(), port.read_line(), port.read(), port.read_line()
+    (1, '" 2"', 'second', '"third"')
+    >>> port.read_line()
+    eof
+    """
+
+    def __init__(self, file, name):
+        self.file = file
+        self.name = name
+        self.src = None
+        self.line = ''  # The last line read for read
+
+    def __str__(self):
+        return '#[input-port {0}]'.format(self.name)
+
+    def lines(self):
+        """Yield the remaining lines of the port, without line endings,
+        keeping the last one in self.line."""
+        for line in iter(self.file.readline, ''):
+            self.line = line.rstrip('\n')
+            yield self.line
+
+    def rest_of_line(self):
+        """Consume and return the text of self.line after the tokens that
+        read has consumed."""
+        remaining = 0
+        while self.src.more_on_line:
+            self.src.remove_front()
+            remaining += 1
+        ends = []
+        token, end = next_candidate_token(self.line, 0)
+        while token is not None:
+            ends.append(end)
+            token, end = next_candidate_token(self.line, end)
+        return self.line[ends[-remaining - 1]:]
+
+    def read_line(self):
+        """Return the next line, or what is left of the line that read
+        stopped in, as a Scheme string, or eof."""
+        if self.src is not None and self.src.more_on_line:
+            return make_string(self.rest_of_line())
+        line = self.file.readline()
+        if not line:
+            return eof
+        return make_string(line.rstrip('\n'))
+
+    def read(self):
+        """Parse and return the next expression, or eof."""
+        if self.src is None:
+            self.src = Buffer(tokenize_lines(self.lines()))
+        try:
+            return scheme_read(self.src)
+        except EOFError:
+            return eof
+
+    def close(self):
+        self.file.close()
+
+class OutputPort:
+    """A port writing to FILE, a Python text file or file-like object."""
+
+    def __init__(self, file, name):
+        self.file = file
+        self.name = name
+
+    def __str__(self):
+        return '#[output-port {0}]'.format(self.name)
+
+    def write(self, text):
+        self.file.write(text)
+
+    def getvalue(self):
+        """Return everything written to a string port as a Scheme string."""
+        return make_string(self.file.getvalue())
+
+    def close(self):
+        self.file.close()
+
+def check_string(val, k, name):
+    """Check that VAL, argument K to NAME, is a Scheme string and return its
+    text."""
+    check_type(val, scheme_stringp, k, name)
+    return string_value(val)
+
+def open_port(filename, mode, port_class, name):
+    filename = check_string(filename, 0, name)
+    try:
+        return port_class(open(filename, mode, buffering=CHUNK_SIZE), filename)
+    except IOError as exc:
+        raise SchemeError(str(exc))
+
+def scheme_open_input_file(filename):
+    return open_port(filename, 'r', InputPort, 'open-input-file')
+
+def scheme_open_output_file(filename):
+    return open_port(filename, 'w', OutputPort, 'open-output-file')
+
+def scheme_open_input_string(s):
+    return InputPort(io.StringIO(check_string(s, 0, 'open-input-string')),
+                     'string')
+
+def scheme_read_line(port):
+    check_type(port, lambda x: isinstance(x, InputPort), 0, 'read-line')
+    return port.read_line()
+
+def scheme_read_port(port):
+    check_type(port, lambda x: isinstance(x, InputPort), 0, 'read')
+    return port.read()
+
+def output_port(port, name):
+    """Return PORT, or an OutputPort for standard output if it is None."""
+    if port is None:
+        return OutputPort(sys.stdout, 'stdout')
+    check_type(port, lambda x: isinstance(x, OutputPort), 1, name)
+    return port
+
+def scheme_write(val, port=None):
+    output_port(port, 'write').write(repl_str(val))
+
+def scheme_write_string(s, port=None):
+    output_port(port, 'write-string').write(check_string(s, 0, 'write-string'))
+
+def scheme_close_port(port):
+    check_type(port, lambda x: isinstance(x, (InputPort, OutputPort)), 0,
+               'close-port')
+    port.close()
+
+def scheme_eof_objectp(val):
+    return val is eof
+
+PORT_BUILTINS = [
+    ('open-input-file', scheme_open_input_file, 'open-input-file'),
+    ('open-output-file', scheme_open_output_file, 'open-output-file'),
+    ('open-input-string', scheme_open_input_string, 'open-input-string'),
+    ('read-line', scheme_read_line, 'read-line'),
+    ('read', scheme_read_port, 'read'),
+    ('write', scheme_write, 'write'),
+    ('write-string', scheme_write_string, 'write-string'),
+    ('close-port', scheme_close_port, 'close-port'),
+    ('eof-object?', scheme_eof_objectp, 'eof-object?'),
+]
@@ -4,7 +4,7 @@ with a parser for Scheme expressions.
 In addition to the types defined in this file, some data types in Scheme are
 represented by their corresponding type in Python:
     number:       int or float
-    symbol:       string
+    symbol:       string, interned so that equal symbols are the same object
     boolean:      bool
     unspecified:  None
 
@@ -15,6 +15,7 @@ The __str__ method of a Scheme value will return a Scheme expression that
 would be read to the value, where possible.
 """
 
+from sys import intern
 from ucb import main, trace, interact
 from scheme_tokens import tokenize_lines, DELIMITERS
 from buffer import Buffer, InputReader, LineReader
@@ -108,6 +109,9 @@ def scheme_read(src):
     True
     >>> scheme_read(Buffer(tokenize_lines(['(+ 1 2)'])))
     Pair('+', Pair(1, Pair(2, nil)))
+    >>> s = scheme_read(Buffer(tokenize_lines(['(define-macro define-macro)'])))
+    >>> s.first is s.second.first
+    True
     """
     if src.current() is None:
         raise EOFError
@@ -119,6 +123,8 @@ def scheme_read(src):
     if val == 'nil':
         return nil
     elif val not in DELIMITERS:
+        if isinstance(val, str):
+            return intern(val)
         return val
     elif val == "(":
         return read_tail(src)
@@ -0,0 +1,97 @@
+"""Counters for the hot paths of the Scheme interpreter.
+
+An InterpStats instance records how often each kind of expression is
+evaluated, how many environment frames and trampoline Thunks are created, and
+how often (and for how long) each built-in procedure is called.  The
+interpreter only touches these counters while instrumentation is enabled; see
+enable_stats in scheme.py.
+"""
+
+import json
+import threading
+import time
+
+class InterpStats:
+    """Evaluation counters collected while instrumentation is enabled.
+
+    >>> stats = InterpStats()
+    >>> stats.count_eval('if')
+    >>> stats.count_eval('if')
+    >>> stats.count_frame(3)
+    >>> snapshot = stats.snapshot()
+    >>> snapshot['evals']
+    {'if': 2}
+    >>> snapshot['frames'], snapshot['bindings_copied']
+    (1, 3)
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set every counter back to zero."""
+        self.started = time.time()
+        self.evals = {}
+        self.frames = 0
+        self.bindings_copied = 0
+        self.thunks = 0
+        self.trampoline_iterations = 0
+        self.builtin_calls = {}
+        self.builtin_seconds = {}
+
+    def count_eval(self, kind):
+        """Record one evaluation of an expression of KIND, which is the name
+        of a special form, 'call', 'symbol' or 'self-evaluating'."""
+        self.evals[kind] = self.evals.get(kind, 0) + 1
+
+    def count_frame(self, bindings):
+        """Record one new Frame whose creation copied BINDINGS bindings."""
+        self.frames += 1
+        self.bindings_copied += bindings
+
+    def count_builtin(self, name, seconds):
+        """Record one call to the built-in procedure NAME lasting SECONDS.
+        The time is inclusive of any Scheme code the built-in evaluates."""
+        self.builtin_calls[name] = self.builtin_calls.get(name, 0) + 1
+        self.builtin_seconds[name] = self.builtin_seconds.get(name, 0) + seconds
+
+    def snapshot(self):
+        """Return the current counters as a dictionary of plain values."""
+        return {'time': time.time(),
+                'elapsed': time.time() - self.started,
+                'evals': dict(self.evals),
+                'frames': self.frames,
+                'bindings_copied': self.bindings_copied,
+                'thunks': self.thunks,
+                'trampoline_iterations': self.trampoline_iterations,
+                'builtin_calls': dict(self.builtin_calls),
+                'builtin_seconds': dict(self.builtin_seconds)}
+
+class StatsDumper(threading.Thread):
+    """A daemon thread that appends a JSON line snapshot of the counters
+    returned by GET_STATS to the file at PATH every INTERVAL seconds."""
+
+    def __init__(self, get_stats, path, interval=1.0):
+        super().__init__(daemon=True)
+        self.get_stats = get_stats
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def dump(self):
+        """Append one snapshot, unless instrumentation has been disabled."""
+        stats = self.get_stats()
+        if stats is not None:
+            with open(self.path, 'a') as outfile:
+                outfile.write(json.dumps(stats.snapshot(), sort_keys=True))
+                outfile.write('\n')
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.dump()
+
+    def stop(self):
+        """Stop the thread and write a final snapshot."""
+        self.stopped.set()
+        self.join()
+        self.dump()
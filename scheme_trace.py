@@ -0,0 +1,151 @@
+"""A shadow stack of Scheme procedure calls and a sampling profiler for it.
+
+Tail calls are evaluated by trampolining Thunks, so the Python stack shows
+only tail_eval and scheme_eval frames. The interpreter instead records each
+call to a user-defined procedure on a CallStack. Every trampoline owns the
+entries at and above its base; a tail call replaces the trampoline's entry
+rather than adding one, so the stack stays as deep as the non-tail calls.
+
+A CallStack is thread-local: each thread evaluating Scheme sees only the
+calls it made.
+"""
+
+import collections
+import threading
+
+class CallStack(threading.local):
+    """The Scheme procedures being applied by the current thread, outermost
+    first.
+
+    >>> stack = CallStack()
+    >>> saved = stack.enter()
+    >>> stack.push('f', '(f 1)')
+    >>> stack.push('g', '(g 2)')   # A tail call replaces f
+    >>> inner = stack.enter()
+    >>> stack.push('h', '(h 3)')
+    >>> stack.names()
+    ['g', 'h']
+    >>> stack.exit(inner)
+    >>> stack.names()
+    ['g']
+    >>> stack.exit(saved)
+    >>> stack.names()
+    []
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.base = 0
+
+    def enter(self):
+        """Start a trampoline, returning the base to pass to exit."""
+        base, self.base = self.base, len(self.frames)
+        return base
+
+    def exit(self, base):
+        """End the current trampoline, discarding its entry and restoring
+        BASE, the value returned by the matching call to enter."""
+        del self.frames[self.base:]
+        self.base = base
+
+    def push(self, procedure, call_site):
+        """Record a call to PROCEDURE from the expression CALL_SITE as the
+        entry of the current trampoline."""
+        del self.frames[self.base:]
+        self.frames.append((procedure, call_site))
+
+    def names(self):
+        """Return the names of the procedures on the stack."""
+        return frame_names(self.frames)
+
+    def annotate(self, err):
+        """Append the stack to the message of the exception ERR, unless an
+        inner trampoline has already done so."""
+        if hasattr(err, 'scheme_stack'):
+            return
+        err.scheme_stack = list(self.frames)
+        if err.scheme_stack:
+            err.args = ('{0}\n{1}'.format(err, format_stack(err.scheme_stack)),)
+
+def frame_names(frames):
+    """Return the names of the procedures in FRAMES, which may be the frames
+    list of a CallStack being changed by another thread."""
+    return [frame_name(procedure) for procedure, _ in list(frames)]
+
+def frame_name(procedure):
+    """Return the name of PROCEDURE as shown in stack traces."""
+    return getattr(procedure, 'name', None) or str(procedure)
+
+MAX_TRACE_FRAMES = 20
+MAX_CALL_SITE = 60
+
+def format_stack(frames):
+    """Format FRAMES, a list of (procedure, call site) pairs, as a traceback
+    with the innermost call last.
+
+    >>> print(format_stack([('f', '(f 1)'), ('g', None)]))
+    Scheme traceback (most recent call last):
+      f: (f 1)
+      g
+    """
+    lines = ['Scheme traceback (most recent call last):']
+    if len(frames) > MAX_TRACE_FRAMES:
+        lines.append('  ... {0} more'.format(len(frames) - MAX_TRACE_FRAMES))
+        frames = frames[-MAX_TRACE_FRAMES:]
+    for procedure, call_site in frames:
+        line = '  ' + frame_name(procedure)
+        if call_site is not None:
+            site = str(call_site)
+            if len(site) > MAX_CALL_SITE:
+                site = site[:MAX_CALL_SITE - 3] + '...'
+            line += ': ' + site
+        lines.append(line)
+    return '\n'.join(lines)
+
+class StackSampler(threading.Thread):
+    """A daemon thread that records the procedure names on CALL_STACK every
+    INTERVAL seconds, to find where a long-running program spends its time.
+    It samples the stack of the thread that creates it.
+
+    Only the evaluating thread changes the stack; the sampler copies it, which
+    is atomic, so sampling adds no cost to evaluation beyond the thread switch.
+    """
+
+    def __init__(self, call_stack, interval=0.01):
+        super().__init__(daemon=True)
+        self.frames = call_stack.frames  # Changed in place by call_stack
+        self.interval = interval
+        self.samples = collections.Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.samples[tuple(frame_names(self.frames))] += 1
+
+    def stop(self):
+        """Stop sampling and return the collected samples."""
+        self.stopped.set()
+        self.join()
+        return self.samples
+
+    def report(self, limit=10):
+        """Return the LIMIT most sampled stacks and the share of samples in
+        which each procedure was running (self) or on the stack (total)."""
+        total = sum(self.samples.values())
+        if not total:
+            return 'No samples collected.'
+        own, inclusive = collections.Counter(), collections.Counter()
+        for stack, count in self.samples.items():
+            if stack:
+                own[stack[-1]] += count
+            for name in set(stack):
+                inclusive[name] += count
+        lines = ['{0} samples every {1:g} ms'.format(total, self.interval * 1000),
+                 '  self  total  procedure']
+        for name, count in own.most_common(limit):
+            lines.append('{0:6.1%} {1:6.1%}  {2}'.format(
+                count / total, inclusive[name] / total, name))
+        lines.append('  count  stack')
+        for stack, count in self.samples.most_common(limit):
+            lines.append('{0:7}  {1}'.format(count, ' > '.join(stack) or '(top level)'))
+        return '\n'.join(lines)
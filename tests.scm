@@ -45,6 +45,27 @@
 (+ (* 6 (+ (* 9 2) (+ 5 3))) (/ (+ 16 3) 2))
 ; expect 165.5
 
+(list 1 (list 2 3) 4)
+; expect (1 (2 3) 4)
+
+(+ 1 2 (car '(3 4)) (- 5 1))
+; expect 10
+
+(apply + 5)
+; expect Error
+
+(define not-a-procedure 5)
+; expect not-a-procedure
+
+(not-a-procedure)
+; expect Error
+
+(expt 2.0 5000)
+; expect Error
+
+(* 1.0 (expt 10 400))
+; expect Error
+
 ; END PROBLEM 0
 
 ;;; These are examples from several sections of "The Structure
@@ -951,6 +972,87 @@ one-through-four
 ; expect 4
 
 
+;;;;;;;;;;;;;;;;;;;;;;;
+;;; Instrumentation ;;;
+;;;;;;;;;;;;;;;;;;;;;;;
+
+(define (stat name alist)
+  (if (eq? (car (car alist)) name)
+      (cdr (car alist))
+      (stat name (cdr alist))))
+; expect stat
+
+(define (count-to n) (if (= n 0) 0 (count-to (- n 1))))
+; expect count-to
+
+(interp-stats)
+; expect ()
+
+(define stats (interp-stats 'on))
+; expect stats
+
+(define stats (interp-stats 'reset))
+; expect stats
+
+(stat 'frames (interp-stats))
+; expect 0
+
+(count-to 10)
+; expect 0
+
+(> (stat 'frames (interp-stats)) 10)
+; expect #t
+
+(interp-stats 'off)
+; expect ()
+
+(interp-stats 'bogus)
+; expect Error
+
+;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;
+;;; Call frames and parallel runs ;;;
+;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;
+
+(define z 1)
+(define (get-z) z)
+(get-z)
+; expect 1
+
+(define z 2)
+(get-z)
+; expect 2
+
+(run-parallel '((+ 1 2) (get-z) (begin (define z 3) z)))
+; expect (3 2 3)
+
+z
+; expect 2
+
+;;;;;;;;;;;;;
+;;; Ports ;;;
+;;;;;;;;;;;;;
+
+"a string"
+; expect "a string"
+
+(read (open-input-string "(1 (2 3)) 4"))
+; expect (1 (2 3))
+
+(read-line (open-input-string "a line"))
+; expect "a line"
+
+(eof-object? (read-line (open-input-string "")))
+; expect #t
+
+(define lines-port (open-input-string "1 2\nsecond"))
+; expect lines-port
+
+(list (read lines-port) (read-line lines-port) (read lines-port))
+; expect (1 " 2" second)
+
+(call-with-output-string (lambda (port) (write '(1 2) port) (write 3 port)))
+; expect "(1 2)3"
+
 ;;;;;;;;;;;;;;;;;;;;
 ;;; Extra credit ;;;
 ;;;;;;;;;;;;;;;;;;;;